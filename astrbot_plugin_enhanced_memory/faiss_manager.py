@@ -9,14 +9,35 @@ import logging
 logger = logging.getLogger()
 
 class FAISSManager:
-    def __init__(self, index_path: str, dimension: int = 384):
+    def __init__(
+        self,
+        index_path: str,
+        dimension: int = 384,
+        quantization: str = "none",
+        use_mmap: bool = False,
+        index_factory: str = "",
+        train_threshold: int = 50000,
+        nprobe: int = 10,
+        merge_threshold: int = 10000
+    ):
         self.index_path = index_path
         self.dimension = dimension
+        self.quantization = quantization  # "none" | "fp16" | "int8"
+        self.use_mmap = use_mmap
+        # 向量数达到train_threshold后，用index_factory描述的索引（如 "IVF256,PQ32x8"）替换平坦索引
+        self.index_factory = index_factory
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+        # mmap模式下增量索引累积到这么多向量才合并进基础索引，其余时候只单独保存增量索引
+        self.merge_threshold = merge_threshold
         self.index = None
+        self.delta_index = None  # mmap模式下基础索引只读，新增向量先写入这里
+        self._delta_path = f"{index_path}.delta"
         self.id_to_index = {}  # 记忆ID到FAISS索引的映射
         self.index_to_id = {}  # FAISS索引到记忆ID的映射
         self.embedding_model = None
         
+        self._check_index_factory()
         self._ensure_storage_path()
         self.load_index()
         self._initialize_embedding_model()
@@ -34,11 +55,101 @@ class FAISSManager:
             logger.error(f"初始化嵌入模型失败: {e}")
             self.embedding_model = None
 
+    def _create_index(self):
+        """按量化配置创建新的空索引"""
+        if self.quantization == "fp16":
+            return faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_fp16)
+        if self.quantization == "int8":
+            index = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit)
+            # 嵌入向量已归一化，各分量都落在[-1, 1]内，直接用该范围训练量化器
+            bounds = np.array([[-1.0] * self.dimension, [1.0] * self.dimension], dtype='float32')
+            index.train(bounds)
+            return index
+        return faiss.IndexFlatL2(self.dimension)
+
+    def _check_index_factory(self):
+        """检查index_factory配置，只支持IVF类索引（可带OPQ/PCA等预变换）
+        
+        按ID过滤的搜索依赖IVF搜索参数，HNSW等图索引在过滤条件较严时会搜不到结果，
+        不支持的配置直接忽略，继续使用平坦索引
+        """
+        if not self.index_factory:
+            return
+        try:
+            index = faiss.index_factory(self.dimension, self.index_factory)
+        except RuntimeError as e:
+            logger.error(f"index_factory配置无效，继续使用平坦索引: {e}")
+            self.index_factory = ""
+            return
+        if isinstance(index, faiss.IndexPreTransform):
+            index = faiss.downcast_index(index.index)
+        if not isinstance(index, faiss.IndexIVF):
+            logger.error("index_factory只支持IVF类索引（如 \"IVF256,PQ32x8\"、\"OPQ16_64,IVF256,PQ16\"），"
+                         "已忽略 %s，继续使用平坦索引", self.index_factory)
+            self.index_factory = ""
+
+    def _apply_nprobe(self, index):
+        """IVF类索引设置搜索时探查的聚类数"""
+        try:
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        except RuntimeError:
+            pass
+
+    def _needs_training(self) -> bool:
+        """是否该把平坦索引（含fp16/int8标量量化索引）升级为配置的训练型索引"""
+        return (
+            bool(self.index_factory)
+            and isinstance(self.index, (faiss.IndexFlat, faiss.IndexScalarQuantizer))
+            and self.ntotal >= self.train_threshold
+        )
+
+    def _build_trained_index(self, vectors):
+        """用现有向量训练并填充index_factory描述的索引，向量顺序（即位置映射）保持不变"""
+        index = faiss.index_factory(self.dimension, self.index_factory)
+        index.train(vectors)
+        index.add(vectors)
+        self._apply_nprobe(index)
+        logger.info("已将FAISS索引升级为 %s，包含 %d 个向量", self.index_factory, index.ntotal)
+        return index
+
+    def _maybe_upgrade_index(self):
+        """非mmap模式下，向量数达到阈值时就地升级索引"""
+        if self.delta_index is None and self._needs_training():
+            self.index = self._build_trained_index(self.index.reconstruct_n(0, self.index.ntotal))
+
+    def _read_mmap_index(self):
+        """以mmap只读方式打开基础索引文件
+        
+        IO_FLAG_MMAP只映射IVF索引（含带预变换的IVF索引）的倒排表；平坦/标量量化索引的向量数据需要IO_FLAG_MMAP_IFC（faiss>=1.9），
+        两者不能同时使用，按索引文件开头的类型标记选择
+        """
+        with open(self.index_path, 'rb') as f:
+            fourcc = f.read(4)
+        # index_factory只会生成IVF索引，预变换索引（IxPT）内层同样是IVF
+        is_ivf = fourcc[:2] == b"Iw" or fourcc == b"IxPT"
+        if is_ivf:
+            flags = faiss.IO_FLAG_MMAP
+        elif hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            flags = faiss.IO_FLAG_MMAP_IFC
+        else:
+            logger.warning("当前faiss版本不支持mmap平坦索引，向量仍会全部读入内存；需要 faiss>=1.9 或使用IVF索引")
+            flags = 0
+        return faiss.read_index(self.index_path, flags | faiss.IO_FLAG_READ_ONLY)
+
     def load_index(self):
         """加载FAISS索引"""
         try:
             if os.path.exists(self.index_path):
-                self.index = faiss.read_index(self.index_path)
+                if self.use_mmap:
+                    self.index = self._read_mmap_index()
+                    if os.path.exists(self._delta_path):
+                        # 上次关闭前尚未合并的增量向量
+                        self.delta_index = faiss.read_index(self._delta_path)
+                    else:
+                        self.delta_index = faiss.IndexFlatL2(self.dimension)
+                else:
+                    self.index = faiss.read_index(self.index_path)
+                self._apply_nprobe(self.index)
                 
                 # 加载ID映射
                 mapping_path = f"{self.index_path}.mapping"
@@ -46,21 +157,45 @@ class FAISSManager:
                     with open(mapping_path, 'r', encoding='utf-8') as f:
                         mapping_data = json.load(f)
                         self.id_to_index = mapping_data.get("id_to_index", {})
-                        self.index_to_id = mapping_data.get("index_to_id", {})
+                        # JSON的键总是字符串，还原成整数位置，否则搜索结果无法映射回记忆ID
+                        self.index_to_id = {
+                            int(idx): memory_id
+                            for idx, memory_id in mapping_data.get("index_to_id", {}).items()
+                        }
                 
                 logger.info(f"已加载FAISS索引，包含 {self.index.ntotal} 个向量")
             else:
                 # 创建新的索引
-                self.index = faiss.IndexFlatL2(self.dimension)
+                self.index = self._create_index()
                 logger.info("创建了新的FAISS索引")
         except Exception as e:
             logger.error(f"加载FAISS索引失败: {e}")
-            self.index = faiss.IndexFlatL2(self.dimension)
+            self.index = self._create_index()
+    
+    @property
+    def ntotal(self) -> int:
+        """基础索引与增量索引中的向量总数"""
+        if self.delta_index is None:
+            return self.index.ntotal
+        return self.index.ntotal + self.delta_index.ntotal
+    
+    def _writable_index(self):
+        """返回新增向量应写入的索引"""
+        return self.delta_index if self.delta_index is not None else self.index
     
-    def save_index(self):
-        """保存FAISS索引"""
+    def save_index(self, merge: bool = False):
+        """保存FAISS索引
+        
+        mmap模式下增量索引达到merge_threshold或merge为True时才合并进基础索引，
+        否则只写入较小的增量索引文件，基础索引文件保持不变
+        """
         try:
-            faiss.write_index(self.index, self.index_path)
+            if self.delta_index is None:
+                self._write_index_file(self.index, self.index_path)
+            elif self.delta_index.ntotal >= self.merge_threshold or (merge and self.delta_index.ntotal > 0):
+                self._merge_delta()
+            elif self.delta_index.ntotal > 0:
+                self._write_index_file(self.delta_index, self._delta_path)
             
             # 保存ID映射
             mapping_path = f"{self.index_path}.mapping"
@@ -70,12 +205,42 @@ class FAISSManager:
                     "index_to_id": self.index_to_id
                 }, f, ensure_ascii=False, indent=2)
             
-            logger.info(f"已保存FAISS索引，包含 {self.index.ntotal} 个向量")
+            logger.info("已保存FAISS索引，包含 %d 个向量", self.ntotal)
             return True
         except Exception as e:
             logger.error(f"保存FAISS索引失败: {e}")
             return False
     
+    def flush(self):
+        """合并增量索引并保存，关闭前调用；非mmap模式下每次变更都已保存，无需处理"""
+        if self.delta_index is None:
+            return True
+        return self.save_index(merge=True)
+    
+    def _merge_delta(self):
+        """把增量向量合并进基础索引的副本，写盘后重新以mmap方式打开"""
+        delta_vectors = self.delta_index.reconstruct_n(0, self.delta_index.ntotal)
+        if self._needs_training():
+            base_vectors = self.index.reconstruct_n(0, self.index.ntotal)
+            merged = self._build_trained_index(np.vstack([base_vectors, delta_vectors]))
+        else:
+            # mmap打开的索引数据不归索引所有，无法clone后追加，改为从文件完整读入一份
+            merged = faiss.read_index(self.index_path)
+            merged.add(delta_vectors)
+        self._write_index_file(merged, self.index_path)
+        del merged
+        self.index = self._read_mmap_index()
+        self._apply_nprobe(self.index)
+        self.delta_index.reset()
+        if os.path.exists(self._delta_path):
+            os.remove(self._delta_path)
+    
+    def _write_index_file(self, index, path: str):
+        """先写临时文件再替换，正在被mmap的旧文件不会被截断"""
+        tmp_path = f"{path}.tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+    
     def add_memory(self, memory_id: str, text: str):
         """添加记忆到向量索引"""
         try:
@@ -87,19 +252,47 @@ class FAISSManager:
             embedding = np.array(embedding, dtype='float32')
             
             # 添加到索引
-            idx = self.index.ntotal
-            self.index.add(embedding)
+            idx = self.ntotal
+            self._writable_index().add(embedding)
             
             # 更新映射
             self.id_to_index[memory_id] = idx
             self.index_to_id[idx] = memory_id
             
+            self._maybe_upgrade_index()
             self.save_index()
             return True
         except Exception as e:
             logger.error(f"添加记忆到向量索引失败: {e}")
             return False
     
+    def add_batch(self, memory_ids: List[str], texts: List[str], batch_size: int = 64):
+        """批量添加记忆到向量索引，只编码、写入和保存一次"""
+        try:
+            if self.embedding_model is None or not memory_ids:
+                return False
+            
+            # 一次性生成所有嵌入向量
+            embeddings = self.embedding_model.encode(texts, batch_size=batch_size)
+            embeddings = np.asarray(embeddings, dtype='float32')
+            
+            # 添加到索引
+            start = self.ntotal
+            self._writable_index().add(embeddings)
+            
+            # 更新映射
+            for offset, memory_id in enumerate(memory_ids):
+                idx = start + offset
+                self.id_to_index[memory_id] = idx
+                self.index_to_id[idx] = memory_id
+            
+            self._maybe_upgrade_index()
+            self.save_index()
+            return True
+        except Exception as e:
+            logger.error(f"批量添加记忆到向量索引失败: {e}")
+            return False
+    
     def remove_memory(self, memory_id: str):
         """从向量索引中移除记忆"""
         try:
@@ -120,25 +313,80 @@ class FAISSManager:
             logger.error(f"从向量索引中移除记忆失败: {e}")
             return False
     
-    def search_similar(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """语义搜索相似记忆"""
+    def _search_in(self, index, query_embedding, k: int, positions=None):
+        """在单个索引中搜索，positions不为None时只在这些位置中查找"""
+        if positions is None:
+            return index.search(query_embedding, k)
+        if positions.size == 0:
+            return np.full((1, k), np.inf, dtype='float32'), np.full((1, k), -1, dtype='int64')
+        selector = faiss.IDSelectorBatch(positions.size, faiss.swig_ptr(positions))
+        if faiss.try_extract_index_ivf(index) is None:
+            params = faiss.SearchParameters(sel=selector)
+        else:
+            # IVF索引要求IVF专用的搜索参数，带预变换时还要包一层交给内层索引
+            ivf_params = faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+            if isinstance(index, faiss.IndexPreTransform):
+                params = faiss.SearchParametersPreTransform(index_params=ivf_params)
+            else:
+                params = ivf_params
+        return index.search(query_embedding, k, params=params)
+    
+    def remove_batch(self, memory_ids: List[str]):
+        """批量从向量索引中移除记忆，只保存一次"""
+        try:
+            removed = 0
+            for memory_id in memory_ids:
+                idx = self.id_to_index.pop(memory_id, None)
+                if idx is not None:
+                    self.index_to_id.pop(idx, None)
+                    removed += 1
+            
+            if removed:
+                self.save_index()
+            return removed > 0
+        except Exception as e:
+            logger.error(f"批量从向量索引中移除记忆失败: {e}")
+            return False
+    
+    def search_similar(self, query: str, k: int = 5, id_filter: List[str] = None) -> List[Dict[str, Any]]:
+        """语义搜索相似记忆，id_filter不为None时只在这些记忆中搜索"""
         try:
             if self.embedding_model is None:
                 logger.warning("嵌入模型未初始化，无法进行语义搜索")
                 return []
+            
+            # 把候选记忆ID换算成索引位置，搜索时直接跳过其余向量
+            base_positions = delta_positions = None
+            if id_filter is not None:
+                positions = np.array(
+                    [self.id_to_index[memory_id] for memory_id in id_filter if memory_id in self.id_to_index],
+                    dtype='int64'
+                )
+                if positions.size == 0:
+                    return []
+                base_positions = positions[positions < self.index.ntotal]
+                delta_positions = positions[positions >= self.index.ntotal] - self.index.ntotal
                 
             # 生成查询向量
             query_embedding = self.embedding_model.encode([query])
             query_embedding = np.array(query_embedding, dtype='float32')
             
             # 搜索相似向量
-            distances, indices = self.index.search(query_embedding, k)
+            distances, indices = self._search_in(self.index, query_embedding, k, base_positions)
+            if self.delta_index is not None and self.delta_index.ntotal > 0:
+                # 合并增量索引的结果，增量索引中的位置排在基础索引之后
+                delta_distances, delta_indices = self._search_in(self.delta_index, query_embedding, k, delta_positions)
+                delta_indices = np.where(delta_indices >= 0, delta_indices + self.index.ntotal, -1)
+                distances = np.concatenate([distances, delta_distances], axis=1)
+                indices = np.concatenate([indices, delta_indices], axis=1)
+                order = np.argsort(distances[0])[:k]
+                distances, indices = distances[:, order], indices[:, order]
             
             # 添加调试信息
-            logger.debug(f"搜索查询: {query}")
-            logger.debug(f"索引总数: {self.index.ntotal}")
-            logger.debug(f"找到的索引: {indices}")
-            logger.debug(f"距离: {distances}")
+            logger.debug("搜索查询: %s", query)
+            logger.debug("索引总数: %d", self.ntotal)
+            logger.debug("找到的索引: %s", indices)
+            logger.debug("距离: %s", distances)
             
             # 转换为记忆ID
             results = []
@@ -150,7 +398,7 @@ class FAISSManager:
                         "distance": distances[0][i]
                     })
             
-            logger.debug(f"结果数量: {len(results)}")
+            logger.debug("结果数量: %d", len(results))
             
             return results
         except Exception as e:
@@ -1,12 +1,14 @@
 import os
 import sys
 import json
-import uuid
+import secrets
 import logging
 import asyncio
+import heapq
 import re
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Set
+from operator import itemgetter
+from typing import Dict, Any, List, Optional
 
 # 添加当前目录到路径，确保模块导入正常
 sys.path.append(os.path.dirname(__file__))
@@ -15,6 +17,22 @@ from astrbot.api.star import Context, Star, register
 from astrbot.api.event import AstrMessageEvent, filter
 from astrbot.api import logger as astrbot_logger
 
+from memory_storage import (
+    CSV_BUFFER_SIZE, KeywordIndex, MemoryStats,
+    dump_json, json_line, parse_json, read_json_file, write_file_atomic
+)
+
+# 统计命令中组件状态的显示顺序和名称
+_COMPONENT_LABELS = (
+    ("semantic_search", "语义搜索"),
+    ("auto_extraction", "自动提取"),
+    ("association_management", "关联管理"),
+    ("data_import_export", "数据导入导出"),
+    ("ai_integration", "AI集成"),
+    ("ai_organization", "AI梳理"),
+)
+_BOOL_EMOJI = ("❌", "✅")
+
 class MemoryAssociationManager:
     """记忆关联管理器"""
     def __init__(self, storage_path: str):
@@ -73,16 +91,9 @@ class MemoryAssociationManager:
         if memory_id not in self.associations:
             return []
         
-        associations = []
-        for related_id, strength in self.associations[memory_id].items():
-            associations.append({
-                "memory_id": related_id,
-                "strength": strength
-            })
-        
-        # 按关联强度排序
-        associations.sort(key=lambda x: x["strength"], reverse=True)
-        return associations[:limit]
+        # 按关联强度取前N个，只为选中的关联构造结果
+        top = heapq.nlargest(limit, self.associations[memory_id].items(), key=itemgetter(1))
+        return [{"memory_id": related_id, "strength": strength} for related_id, strength in top]
     
     def auto_create_associations(self, memory_id: str, content: str, all_memories: Dict[str, Any], threshold: float = 0.3):
         """自动创建关联"""
@@ -225,19 +236,20 @@ class DataExportManager:
                 filename = f"memories_export_{timestamp}.csv"
                 filepath = os.path.join(self.storage_path, filename)
                 
-                with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                with open(filepath, 'w', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as f:
                     writer = csv.writer(f)
                     writer.writerow(["ID", "Content", "Type", "Importance", "Created At", "Last Accessed"])
-                    
-                    for memory_id, memory in memories.items():
-                        writer.writerow([
+                    writer.writerows(
+                        (
                             memory_id,
                             memory.get("content", ""),
                             memory.get("type", ""),
                             memory.get("importance", 0),
                             memory.get("created_at", ""),
                             memory.get("last_accessed", "")
-                        ])
+                        )
+                        for memory_id, memory in memories.items()
+                    )
                 
                 return filepath
             
@@ -258,18 +270,19 @@ class DataExportManager:
             elif format == "csv":
                 import csv
                 memories = {}
+                now_iso = datetime.now().isoformat()
                 
-                with open(filepath, 'r', encoding='utf-8') as f:
+                with open(filepath, 'r', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as f:
                     reader = csv.DictReader(f)
                     for row in reader:
-                        memory_id = row.get("ID", str(uuid.uuid4()))
+                        memory_id = row.get("ID") or secrets.token_hex(16)
                         memory = {
                             "id": memory_id,
                             "content": row.get("Content", ""),
                             "type": row.get("Type", "other"),
                             "importance": float(row.get("Importance", 0.5)),
-                            "created_at": row.get("Created At", datetime.now().isoformat()),
-                            "last_accessed": datetime.now().isoformat(),
+                            "created_at": row.get("Created At", now_iso),
+                            "last_accessed": now_iso,
                             "access_count": 0
                         }
                         memories[memory_id] = memory
@@ -544,7 +557,9 @@ class EnhancedMemoryManager:
                  model_cache_ttl: int = 60,
                  # 自动提取配置
                  auto_extract_min_importance: float = 0.3,
-                 extraction_prompt: str = None):
+                 extraction_prompt: str = None,
+                 # 追加日志合并阈值
+                 compact_min_entries: int = 256):
         
         self.storage_path = storage_path
         self.context = context
@@ -576,6 +591,18 @@ class EnhancedMemoryManager:
         self._request_lock = asyncio.Lock()
         # ==================== 配置保存结束 ====================
         
+        # 追加日志：新增记忆只追加一行到 memories.jsonl，
+        # 日志条数达到 max(compact_min_entries, 记忆总数) 时才整体重写 memories.json
+        self.compact_min_entries = compact_min_entries
+        self._log_entries = 0
+        self._log_file = None
+        
+        # 关键词搜索倒排索引
+        self._search_index = KeywordIndex()
+        
+        # 统计计数器，随增删改增量维护
+        self._stats = MemoryStats("other")
+        
         # 确保存储路径存在
         self._ensure_storage_path()
         self._initialize_components()
@@ -616,27 +643,92 @@ class EnhancedMemoryManager:
         try:
             memories_path = os.path.join(self.storage_path, "memories.json")
             if os.path.exists(memories_path):
-                with open(memories_path, 'r', encoding='utf-8') as f:
-                    self.memories = json.load(f)
-                astrbot_logger.info(f"Loaded {len(self.memories)} memories")
+                self.memories = read_json_file(memories_path)
+                astrbot_logger.info("Loaded %d memories", len(self.memories))
             else:
                 self.memories = {}
                 astrbot_logger.info("No existing memories found, starting fresh")
         except Exception as e:
             astrbot_logger.error(f"Failed to load memories: {e}")
             self.memories = {}
+        
+        replayed = self._replay_log()
+        self._search_index.rebuild(self.memories)
+        self._stats.rebuild(self.memories)
+        
+        # 把上次运行留下的日志合并进快照
+        if replayed:
+            astrbot_logger.info("Replayed %d memories from append log", replayed)
+            self.save_memories()
+    
+    def _replay_log(self) -> int:
+        """将追加日志中的记忆合并到内存，返回条数"""
+        log_path = os.path.join(self.storage_path, "memories.jsonl")
+        if not os.path.exists(log_path):
+            return 0
+        
+        replayed = 0
+        try:
+            with open(log_path, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        memory = parse_json(line)
+                    except ValueError:
+                        # 进程在写最后一行时中断
+                        astrbot_logger.warning("Skipping truncated line in append log")
+                        break
+                    self.memories[memory["id"]] = memory
+                    replayed += 1
+        except Exception as e:
+            astrbot_logger.error(f"Failed to replay append log: {e}")
+        return replayed
     
     def save_memories(self):
-        """保存记忆"""
+        """保存记忆（重写完整快照并清空追加日志）"""
         try:
             memories_path = os.path.join(self.storage_path, "memories.json")
-            with open(memories_path, 'w', encoding='utf-8') as f:
-                json.dump(self.memories, f, ensure_ascii=False, indent=2)
+            write_file_atomic(memories_path, dump_json(self.memories))
+            self._truncate_log()
             return True
         except Exception as e:
             astrbot_logger.error(f"Failed to save memories: {e}")
             return False
     
+    def _append_log(self, memory: Dict[str, Any]):
+        """追加一条新记忆到日志，必要时合并为完整快照"""
+        try:
+            if self._log_file is None:
+                log_path = os.path.join(self.storage_path, "memories.jsonl")
+                self._log_file = open(log_path, 'ab', buffering=0)
+            self._log_file.write(json_line(memory))
+            self._log_entries += 1
+        except Exception as e:
+            astrbot_logger.error(f"Failed to append memory log: {e}")
+            self.save_memories()
+            return
+        
+        if self._log_entries >= max(self.compact_min_entries, len(self.memories)):
+            self.save_memories()
+    
+    def _truncate_log(self):
+        """快照写入后清空追加日志"""
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        log_path = os.path.join(self.storage_path, "memories.jsonl")
+        if os.path.exists(log_path):
+            open(log_path, 'wb').close()
+        self._log_entries = 0
+    
+    def flush(self):
+        """将追加日志合并进快照"""
+        if not self._log_entries:
+            return True
+        return self.save_memories()
+    
     async def _acquire_request_slot(self):
         """获取请求槽位，控制并发数量"""
         async with self._request_lock:
@@ -698,19 +790,20 @@ class EnhancedMemoryManager:
     def add_memory(self, content: str, importance: float = 0.5, memory_type: str = None, 
                   auto_associate: bool = True, **kwargs):
         """添加记忆"""
-        memory_id = str(uuid.uuid4())
+        memory_id = secrets.token_hex(16)
         
         # 自动分类记忆类型
         if memory_type is None:
             memory_type = self._classify_memory_type(content)
         
+        now_iso = datetime.now().isoformat()
         memory_data = {
             "id": memory_id,
             "content": content,
             "importance": importance,
             "type": memory_type,
-            "created_at": datetime.now().isoformat(),
-            "last_accessed": datetime.now().isoformat(),
+            "created_at": now_iso,
+            "last_accessed": now_iso,
             "access_count": 0
         }
         
@@ -723,14 +816,17 @@ class EnhancedMemoryManager:
             memory_data["keywords"] = []
         
         self.memories[memory_id] = memory_data
-        self.save_memories()
+        self._search_index.add(memory_id, content)
+        self._stats.track(memory_data)
+        self._append_log(memory_data)
         
         # 自动创建关联
         if auto_associate and len(self.memories) > 1:
             created_count = self.association_manager.auto_create_associations(memory_id, content, self.memories)
-            astrbot_logger.info(f"Auto created {created_count} associations for memory {memory_id}")
+            astrbot_logger.info("Auto created %d associations for memory %s", created_count, memory_id)
         
-        astrbot_logger.info(f"Added memory: {content[:50]}...")
+        if astrbot_logger.isEnabledFor(logging.INFO):
+            astrbot_logger.info("Added memory: %s...", content[:50])
         return memory_id
     
     def delete_memory(self, memory_id: str):
@@ -744,6 +840,8 @@ class EnhancedMemoryManager:
                 del self.association_manager.associations[memory_id]
             
             # 移除记忆
+            self._search_index.remove(memory_id)
+            self._stats.track(self.memories[memory_id], -1)
             del self.memories[memory_id]
             self.save_memories()
             self.association_manager.save_associations()
@@ -754,7 +852,11 @@ class EnhancedMemoryManager:
         """更新记忆"""
         if memory_id in self.memories:
             memory = self.memories[memory_id]
+            if "content" in kwargs:
+                self._search_index.add(memory_id, kwargs["content"])
+            self._stats.track(memory, -1)
             memory.update(kwargs)
+            self._stats.track(memory)
             memory["last_accessed"] = datetime.now().isoformat()
             self.save_memories()
             return True
@@ -774,33 +876,30 @@ class EnhancedMemoryManager:
             return 'fact'
         else:
             return 'other'
-        
+    
     def search_memories(self, query: str, limit: int = 5, use_semantic: bool = True, 
                        include_associated: bool = False, **kwargs):
         """搜索记忆 - 修复版"""
         results = []
         
         # 调试信息
-        astrbot_logger.info(f"搜索查询: '{query}', 记忆库总数: {len(self.memories)}")
+        astrbot_logger.info("搜索查询: '%s', 记忆库总数: %d", query, len(self.memories))
         
         # 首先进行关键词搜索（确保基础搜索工作）
-        query_lower = query.lower()
         match_count = 0
+        log_matches = astrbot_logger.isEnabledFor(logging.INFO)
         
-        for memory_id, memory in self.memories.items():
-            content = memory.get("content", "")
-            content_lower = content.lower()
-            
-            # 改进的搜索逻辑：检查查询是否在内容中
-            if query_lower in content_lower:
-                memory_copy = memory.copy()
-                memory_copy["match_type"] = "keyword"
-                memory_copy["similarity"] = 1.0
-                results.append(memory_copy)
-                match_count += 1
-                astrbot_logger.info(f"关键词匹配: {content[:50]}...")
+        for memory_id in self._search_index.match(query):
+            memory = self.memories[memory_id]
+            memory_copy = memory.copy()
+            memory_copy["match_type"] = "keyword"
+            memory_copy["similarity"] = 1.0
+            results.append(memory_copy)
+            match_count += 1
+            if log_matches:
+                astrbot_logger.info("关键词匹配: %s...", memory.get('content', '')[:50])
         
-        astrbot_logger.info(f"关键词搜索找到 {match_count} 条匹配")
+        astrbot_logger.info("关键词搜索找到 %d 条匹配", match_count)
         
         # 如果启用了语义搜索且有嵌入模型，尝试语义搜索
         if use_semantic and self.embedding_model is not None and not results:
@@ -830,11 +929,10 @@ class EnhancedMemoryManager:
                         all_results.append(assoc_memory)
             results = all_results
         
-        # 按重要性排序
-        results.sort(key=lambda x: x.get("importance", 0), reverse=True)
+        astrbot_logger.info("搜索完成，找到 %d 条结果", len(results))
         
-        astrbot_logger.info(f"搜索完成，找到 {len(results)} 条结果")
-        return results[:limit]
+        # 按重要性取前N个
+        return heapq.nlargest(limit, results, key=lambda x: x.get("importance", 0))
     
     def _semantic_search(self, query: str, k: int = 5):
         """语义搜索"""
@@ -1035,6 +1133,8 @@ class EnhancedMemoryManager:
         for memory_id, memory in imported_memories.items():
             if memory_id not in self.memories:
                 self.memories[memory_id] = memory
+                self._search_index.add(memory_id, memory.get("content", ""))
+                self._stats.track(memory)
         
         self.save_memories()
         return len(imported_memories)
@@ -1043,11 +1143,11 @@ class EnhancedMemoryManager:
         """获取上下文相关记忆（用于AI集成）"""
         relevant_memories = self.search_memories(query, limit=limit, use_semantic=True)
         
-        context_text = "相关记忆：\n"
+        parts = ["相关记忆：\n"]
         for i, memory in enumerate(relevant_memories, 1):
-            context_text += f"{i}. {memory['content']}\n"
+            parts.append(f"{i}. {memory['content']}\n")
         
-        return context_text
+        return "".join(parts)
     
     async def organize_with_model(self, model_id: str = None, tasks: List[str] = None) -> Dict[str, Any]:
         """使用AI模型梳理记忆 - 增强版"""
@@ -1089,7 +1189,10 @@ class EnhancedMemoryManager:
                     if "memory_id" in item and "suggested_category" in item:
                         memory_id = item["memory_id"]
                         if memory_id in self.memories:
-                            self.memories[memory_id]["type"] = item["suggested_category"]
+                            memory = self.memories[memory_id]
+                            self._stats.track(memory, -1)
+                            memory["type"] = item["suggested_category"]
+                            self._stats.track(memory)
                             applied_changes["categorization"] += 1
             
             # 应用重要性建议
@@ -1100,7 +1203,10 @@ class EnhancedMemoryManager:
                         if memory_id in self.memories:
                             new_importance = float(item["suggested_importance"])
                             if 0 <= new_importance <= 1:
-                                self.memories[memory_id]["importance"] = new_importance
+                                memory = self.memories[memory_id]
+                                self._stats.track(memory, -1)
+                                memory["importance"] = new_importance
+                                self._stats.track(memory)
                                 applied_changes["importance_updates"] += 1
             
             # 应用关联建议
@@ -1167,28 +1273,16 @@ class EnhancedMemoryManager:
     
     def simple_search(self, query: str, limit: int = 5):
         """简单但有效的搜索方法"""
-        results = []
-        query_lower = query.lower()
-        
-        for memory_id, memory in self.memories.items():
-            content = memory.get("content", "").lower()
-            if query_lower in content:
-                results.append(memory)
+        results = [self.memories[memory_id] for memory_id in self._search_index.match(query)]
         
-        # 按重要性排序
-        results.sort(key=lambda x: x.get("importance", 0), reverse=True)
-        return results[:limit]    
+        # 按重要性取前N个
+        return heapq.nlargest(limit, results, key=lambda x: x.get("importance", 0))
     
     def get_stats(self):
         """获取统计信息"""
         total = len(self.memories)
-        type_counts = {}
-        
-        for memory in self.memories.values():
-            mem_type = memory.get('type', 'other')
-            type_counts[mem_type] = type_counts.get(mem_type, 0) + 1
-        
-        avg_importance = sum(m.get('importance', 0) for m in self.memories.values()) / total if total > 0 else 0
+        type_counts = dict(self._stats.type_counts)
+        avg_importance = self._stats.importance_sum / total if total > 0 else 0
         
         # 关联统计
         total_associations = sum(len(v) for v in self.association_manager.associations.values())
@@ -1453,24 +1547,24 @@ class EnhancedMemoryPlugin(Star):
             results = self.memory_manager.simple_search(query, limit=limit)
         
             if results:
-                response = f"🔍 找到 {len(results)} 条相关记忆 (共{total_memories}条):\n\n"
+                parts = [f"🔍 找到 {len(results)} 条相关记忆 (共{total_memories}条):\n\n"]
                 for i, memory in enumerate(results, 1):
                     content = memory['content']
                     mem_type = memory.get('type', '未知')
                     importance = memory.get('importance', 0.5)
                     match_type = memory.get('match_type', 'unknown')
                 
-                    response += f"{i}. {content}\n"
-                    response += f"   类型: {mem_type} | 重要性: {importance:.2f} | 匹配方式: {match_type}"
+                    parts.append(f"{i}. {content}\n")
+                    parts.append(f"   类型: {mem_type} | 重要性: {importance:.2f} | 匹配方式: {match_type}")
                 
                     if memory.get('similarity'):
-                        response += f" | 相似度: {memory['similarity']:.3f}"
+                        parts.append(f" | 相似度: {memory['similarity']:.3f}")
                     if memory.get('association_strength'):
-                        response += f" | 关联强度: {memory['association_strength']:.3f}"
+                        parts.append(f" | 关联强度: {memory['association_strength']:.3f}")
                 
-                    response += f" | ID: {memory['id'][:8]}...\n\n"
+                    parts.append(f" | ID: {memory['id'][:8]}...\n\n")
                 
-                yield event.plain_result(response)
+                yield event.plain_result("".join(parts))
             else:
                 # 显示调试信息
                 debug_info = f"❌ 没有找到相关记忆 (搜索: '{query}')\n"
@@ -1631,14 +1725,14 @@ class EnhancedMemoryPlugin(Star):
                 yield event.plain_result("❌ 没有可用的AI模型，请先配置LLM提供商")
                 return
             
-            response = "🤖 可用AI模型：\n\n"
+            parts = ["🤖 可用AI模型：\n\n"]
             
             for model_id, model_info in available_models.items():
-                response += f"• {model_id}: {model_info['name']}\n"
+                parts.append(f"• {model_id}: {model_info['name']}\n")
             
-            response += "\n💡 使用 /memo_organize model_id=模型ID 指定使用的模型"
+            parts.append("\n💡 使用 /memo_organize model_id=模型ID 指定使用的模型")
             
-            yield event.plain_result(response)
+            yield event.plain_result("".join(parts))
                 
         except Exception as e:
             astrbot_logger.error(f"Error listing models: {e}")
@@ -1658,26 +1752,26 @@ class EnhancedMemoryPlugin(Star):
                 yield event.plain_result(f"❌ {model_info['error']}")
                 return
             
-            response = "🤖 记忆AI模型信息：\n\n"
+            parts = ["🤖 记忆AI模型信息：\n\n"]
             
             # 基本配置
-            response += f"📋 使用框架模型: {'✅' if model_info['use_framework_models'] else '❌'}\n"
-            response += f"🔄 并发请求: {model_info['concurrent_requests']}\n"
-            response += f"💾 模型缓存: {model_info['model_cache_size']} 个\n\n"
+            parts.append(f"📋 使用框架模型: {'✅' if model_info['use_framework_models'] else '❌'}\n")
+            parts.append(f"🔄 并发请求: {model_info['concurrent_requests']}\n")
+            parts.append(f"💾 模型缓存: {model_info['model_cache_size']} 个\n\n")
             
             # 配置的模型
-            response += "🎯 配置的模型：\n"
+            parts.append("🎯 配置的模型：\n")
             for model_type, model_id in model_info['configured_models'].items():
                 status = "✅" if model_id else "❌"
-                response += f"  • {model_type}: {status} {model_id or '未配置'}\n"
+                parts.append(f"  • {model_type}: {status} {model_id or '未配置'}\n")
             
-            response += "\n🔧 激活的模型：\n"
+            parts.append("\n🔧 激活的模型：\n")
             for task, model_name in model_info['active_models'].items():
-                response += f"  • {task}: {model_name}\n"
+                parts.append(f"  • {task}: {model_name}\n")
             
-            response += f"\n📊 可用模型总数: {len(model_info['available_models'])}"
+            parts.append(f"\n📊 可用模型总数: {len(model_info['available_models'])}")
             
-            yield event.plain_result(response)
+            yield event.plain_result("".join(parts))
                 
         except Exception as e:
             astrbot_logger.error(f"Error getting model info: {e}")
@@ -1700,12 +1794,12 @@ class EnhancedMemoryPlugin(Star):
             memory_ids = await self.memory_manager.ai_auto_extract(content, self.conversation_history)
             
             if memory_ids:
-                response = f"✅ AI智能提取完成！\n\n新增 {len(memory_ids)} 条记忆：\n"
+                parts = [f"✅ AI智能提取完成！\n\n新增 {len(memory_ids)} 条记忆：\n"]
                 for i, memory_id in enumerate(memory_ids, 1):
                     if memory_id in self.memory_manager.memories:
                         memory = self.memory_manager.memories[memory_id]
-                        response += f"{i}. {memory['content']}\n"
-                yield event.plain_result(response)
+                        parts.append(f"{i}. {memory['content']}\n")
+                yield event.plain_result("".join(parts))
             else:
                 yield event.plain_result("❌ AI未提取到重要信息，或提取失败")
                 
@@ -1761,28 +1855,26 @@ class EnhancedMemoryPlugin(Star):
     
             stats = self.memory_manager.get_stats()
             
-            response = "📊 记忆系统统计信息：\n\n"
-            response += f"• 总记忆数量: {stats['total_memories']} 条\n"
-            response += f"• 总关联数量: {stats['total_associations']} 个\n"
-            response += f"• 存储路径: {stats['storage_path']}\n"
-            response += f"• 平均重要性: {stats['average_importance']:.2f}\n"
+            parts = [
+                "📊 记忆系统统计信息：\n\n",
+                f"• 总记忆数量: {stats['total_memories']} 条\n",
+                f"• 总关联数量: {stats['total_associations']} 个\n",
+                f"• 存储路径: {stats['storage_path']}\n",
+                f"• 平均重要性: {stats['average_importance']:.2f}\n",
+            ]
             
             if stats.get('type_counts'):
-                response += "\n📁 记忆类型分布：\n"
+                parts.append("\n📁 记忆类型分布：\n")
                 for mem_type, count in stats['type_counts'].items():
-                    response += f"  • {mem_type}: {count} 条\n"
+                    parts.append(f"  • {mem_type}: {count} 条\n")
             
             if stats.get('component_status'):
-                response += "\n⚙️ 组件状态：\n"
+                parts.append("\n⚙️ 组件状态：\n")
                 comp_status = stats['component_status']
-                response += f"  • 语义搜索: {'✅' if comp_status.get('semantic_search') else '❌'}\n"
-                response += f"  • 自动提取: {'✅' if comp_status.get('auto_extraction') else '❌'}\n"
-                response += f"  • 关联管理: {'✅' if comp_status.get('association_management') else '❌'}\n"
-                response += f"  • 数据导入导出: {'✅' if comp_status.get('data_import_export') else '❌'}\n"
-                response += f"  • AI集成: {'✅' if comp_status.get('ai_integration') else '❌'}\n"
-                response += f"  • AI梳理: {'✅' if comp_status.get('ai_organization') else '❌'}\n"
+                for key, label in _COMPONENT_LABELS:
+                    parts.append(f"  • {label}: {_BOOL_EMOJI[bool(comp_status.get(key))]}\n")
                 
-            yield event.plain_result(response)
+            yield event.plain_result("".join(parts))
             
         except Exception as e:
             astrbot_logger.error(f"Error getting stats: {e}")
@@ -1865,8 +1957,8 @@ class EnhancedMemoryPlugin(Star):
         """插件停止时的清理工作"""
         astrbot_logger.info("Enhanced Memory Plugin v1.0.0 is shutting down...")
         try:
-            if self._initialized and hasattr(self.memory_manager, 'save_memories'):
-                self.memory_manager.save_memories()
+            if self._initialized and hasattr(self.memory_manager, 'flush'):
+                self.memory_manager.flush()
                 astrbot_logger.info("Memories saved successfully")
         except Exception as e:
             astrbot_logger.error(f"Error saving memories during shutdown: {e}")
\ No newline at end of file
@@ -6,9 +6,11 @@ import logging
 logger = logging.getLogger()
 
 class MemoryClassifier:
-    def __init__(self, model_path: str, categories: List[str]):
+    def __init__(self, model_path: str, categories: List[str], quantize: bool = False):
         self.model_path = model_path
         self.categories = categories
+        # 推理时把线性层动态量化为int8，CPU上更快、内存更小
+        self.quantize = quantize
         self.tokenizer = None
         self.model = None
         
@@ -63,9 +65,21 @@ class MemoryClassifier:
                 self.tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
                 
                 logger.info("初始化了新的记忆分类模型")
+            
+            if self.quantize:
+                self._quantize_model()
         except Exception as e:
             logger.error(f"加载记忆分类模型失败: {e}")
     
+    def _quantize_model(self):
+        """把模型的线性层动态量化为int8，仅用于推理"""
+        import torch
+        self._float_model = self.model
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        logger.info("已对记忆分类模型进行int8动态量化")
+    
     def save_model(self):
         """保存分类模型"""
         if not self.has_torch:
@@ -73,7 +87,8 @@ class MemoryClassifier:
             
         try:
             if self.model and self.tokenizer:
-                self.model.save_pretrained(self.model_path)
+                # 量化后的模型无法用save_pretrained重新加载，保存原始浮点模型
+                getattr(self, "_float_model", self.model).save_pretrained(self.model_path)
                 self.tokenizer.save_pretrained(self.model_path)
                 logger.info("已保存记忆分类模型")
                 return True
@@ -83,37 +98,45 @@ class MemoryClassifier:
     
     def classify(self, text: str) -> Dict[str, float]:
         """对记忆文本进行分类"""
+        return self.classify_batch([text])[0]
+    
+    def classify_batch(self, texts: List[str], batch_size: int = 32) -> List[Dict[str, float]]:
+        """批量分类，每batch_size条文本只做一次编码和前向计算"""
         if not self.has_torch:
             # 使用简化版分类逻辑
-            return self._simple_classify(text)
+            return [self._simple_classify(text) for text in texts]
             
         try:
             if not self.model or not self.tokenizer:
-                return {category: 0.0 for category in self.categories}
+                return [{category: 0.0 for category in self.categories} for _ in texts]
             
-            # 编码文本
-            inputs = self.tokenizer(
-                text, 
-                return_tensors="pt", 
-                truncation=True, 
-                padding=True, 
-                max_length=128
-            )
-            
-            # 获取预测 - 导入 torch 用于 no_grad
+            # 导入 torch 用于 inference_mode
             import torch
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-            
-            # 转换为类别概率
-            probabilities = predictions[0].numpy()
-            result = {self.categories[i]: float(probabilities[i]) for i in range(len(self.categories))}
-            
-            return result
+            results = []
+            for start in range(0, len(texts), batch_size):
+                # 编码文本
+                inputs = self.tokenizer(
+                    texts[start:start + batch_size], 
+                    return_tensors="pt", 
+                    truncation=True, 
+                    padding=True, 
+                    max_length=128
+                )
+                
+                # 获取预测
+                with torch.inference_mode():
+                    outputs = self.model(**inputs)
+                    predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+                
+                # 转换为类别概率
+                results.extend(
+                    dict(zip(self.categories, map(float, probabilities)))
+                    for probabilities in predictions.numpy()
+                )
+            return results
         except Exception as e:
             logger.error(f"记忆分类失败: {e}")
-            return {category: 0.0 for category in self.categories}
+            return [{category: 0.0 for category in self.categories} for _ in texts]
     
     def _simple_classify(self, text: str) -> Dict[str, float]:
         """简化版分类逻辑"""
@@ -1,19 +1,48 @@
 import re
-import jieba
-import jieba.analyse
 from typing import List, Dict, Any
 import logging
 
+try:
+    # jieba_fast是C加速的jieba，接口完全相同
+    import jieba_fast as jieba
+    import jieba_fast.analyse
+except ImportError:
+    import jieba
+    import jieba.analyse
+
 logger = logging.getLogger()
 
+def _word_re(words: List[str]) -> re.Pattern:
+    """把一组关键词编译成一个正则，一次扫描判断句子是否包含其中任意一个"""
+    return re.compile("|".join(map(re.escape, words)))
+
+# 简单的中文分句规则
+_SENT_RE = re.compile(r'[。！？!?;；]')
+_DIGIT_RE = re.compile(r'\d')
+
+# 重要性评估用的关键词
+_PRONOUN_RE = _word_re(["我", "你", "他", "她", "我们", "你们", "他们"])
+_EMOTION_RE = _word_re(["喜欢", "讨厌", "爱", "恨", "开心", "难过", "生气", "害怕"])
+_VERB_RE = _word_re(["记得", "知道", "认为", "觉得", "想要", "需要", "希望"])
+_QUESTION_RE = _word_re(["吗?", "吗？", "什么", "为什么", "怎么"])
+
+# 记忆类型判断用的关键词，按判断顺序排列
+_TYPE_RULES = (
+    ("事实", _word_re(["是", "有", "在", "属于"])),
+    ("观点", _word_re(["认为", "觉得", "想", "应该"])),
+    ("用户偏好", _word_re(["喜欢", "讨厌", "爱", "恨"])),
+    ("事件", _word_re(["昨天", "今天", "明天", "小时", "分钟"])),
+)
+
 class MemoryExtractor:
     def __init__(self, min_importance: float = 0.3, extract_keywords: bool = True, max_keywords: int = 5):
         self.min_importance = min_importance
         self.extract_keywords = extract_keywords
         self.max_keywords = max_keywords
         
-        # 初始化jieba
+        # 初始化jieba，词典和IDF语料只加载一次
         jieba.initialize()
+        self._extract_tags = jieba.analyse.default_tfidf.extract_tags
     
     def extract_from_text(self, text: str, conversation_context: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """从文本中提取潜在记忆"""
@@ -39,8 +68,7 @@ class MemoryExtractor:
     
     def _split_into_sentences(self, text: str) -> List[str]:
         """将文本分割成句子"""
-        # 简单的中文分句规则
-        sentences = re.split(r'[。！？!?;；]', text)
+        sentences = _SENT_RE.split(text)
         return [s.strip() for s in sentences if s.strip()]
     
     def _calculate_importance(self, sentence: str, conversation_context: List[Dict[str, Any]] = None) -> float:
@@ -49,21 +77,19 @@ class MemoryExtractor:
         importance = 0.1  # 基础重要性
         
         # 包含人称代词（可能关于用户）
-        if any(pronoun in sentence for pronoun in ["我", "你", "他", "她", "我们", "你们", "他们"]):
+        if _PRONOUN_RE.search(sentence):
             importance += 0.2
         
         # 包含情感词
-        emotion_words = ["喜欢", "讨厌", "爱", "恨", "开心", "难过", "生气", "害怕"]
-        if any(word in sentence for word in emotion_words):
+        if _EMOTION_RE.search(sentence):
             importance += 0.3
         
         # 包含重要动词
-        important_verbs = ["记得", "知道", "认为", "觉得", "想要", "需要", "希望"]
-        if any(verb in sentence for verb in important_verbs):
+        if _VERB_RE.search(sentence):
             importance += 0.2
         
         # 包含数字（可能是重要信息）
-        if re.search(r'\d+', sentence):
+        if _DIGIT_RE.search(sentence):
             importance += 0.1
         
         # 基于上下文的重要性调整
@@ -75,7 +101,7 @@ class MemoryExtractor:
                     last_user_message = msg.get("content", "")
                     break
             
-            if last_user_message and any(q in last_user_message for q in ["吗?", "吗？", "什么", "为什么", "怎么"]):
+            if last_user_message and _QUESTION_RE.search(last_user_message):
                 importance += 0.2
         
         return min(importance, 1.0)  # 确保不超过1.0
@@ -83,21 +109,15 @@ class MemoryExtractor:
     def _determine_memory_type(self, sentence: str) -> str:
         """确定记忆类型"""
         # 简单基于关键词的类型判断
-        if any(word in sentence for word in ["是", "有", "在", "属于"]):
-            return "事实"
-        elif any(word in sentence for word in ["认为", "觉得", "想", "应该"]):
-            return "观点"
-        elif any(word in sentence for word in ["喜欢", "讨厌", "爱", "恨"]):
-            return "用户偏好"
-        elif any(word in sentence for word in ["昨天", "今天", "明天", "小时", "分钟"]):
-            return "事件"
-        else:
-            return "其他"
+        for memory_type, pattern in _TYPE_RULES:
+            if pattern.search(sentence):
+                return memory_type
+        return "其他"
     
     def _extract_keywords(self, sentence: str) -> List[str]:
         """提取关键词"""
         try:
-            keywords = jieba.analyse.extract_tags(
+            keywords = self._extract_tags(
                 sentence, 
                 topK=self.max_keywords, 
                 withWeight=False
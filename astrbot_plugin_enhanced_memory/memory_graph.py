@@ -1,4 +1,5 @@
 import networkx as nx
+import heapq
 import json
 import os
 from typing import List, Dict, Any
@@ -81,12 +82,15 @@ class MemoryGraph:
         if memory_id not in self.graph:
             return []
         
-        # 获取直接关联的记忆
-        neighbors = list(self.graph.neighbors(memory_id))
+        # 获取直接关联的记忆，按关联强度取前N个
+        neighbors = heapq.nlargest(
+            max_results,
+            self.graph[memory_id].items(),
+            key=lambda item: item[1].get("strength", 1.0)
+        )
         results = []
         
-        for neighbor_id in neighbors[:max_results]:
-            edge_data = self.graph[memory_id][neighbor_id]
+        for neighbor_id, edge_data in neighbors:
             results.append({
                 "memory_id": neighbor_id,
                 "relation_type": edge_data.get("relation_type", "unknown"),
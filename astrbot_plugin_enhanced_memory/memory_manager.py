@@ -1,26 +1,141 @@
-import json
+import atexit
+import heapq
 import os
-import uuid
+import secrets
+import sys
+import threading
+import time
+import weakref
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import lru_cache, partial
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+from operator import itemgetter
+
+from memory_storage import (
+    CSV_BUFFER_SIZE, KeywordIndex, MemoryStats,
+    dump_json, json_line, parse_json, read_json_file, write_file_atomic
+)
+
+# 可选依赖，不在requirements中：只在未安装orjson时用于流式解析大文件
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # 使用根记录器
 logger = logging.getLogger()
 
+# WAL超过此大小时触发压缩
+WAL_COMPACT_BYTES = 1024 * 1024
+
+# 辅助存储每同步多少次做一次全量核对
+FULL_SYNC_INTERVAL = 1000
+
+# 按类型过滤的语义搜索中，符合类型的记忆不超过此比例时才预先限定搜索范围，
+# 否则直接搜索再过滤更快
+TYPE_PREFILTER_RATIO = 0.5
+
+def _load_json_dict(path: str) -> Dict[str, Any]:
+    """读取顶层为对象的JSON文件
+
+    优先用orjson一次性解析（最快），大文件用mmap映射后直接解析，不再额外复制一份文件内容；
+    没有orjson时用ijson逐条流式解析以降低峰值内存
+    """
+    if orjson is not None or ijson is None:
+        return read_json_file(path)
+    with open(path, 'rb') as f:
+        return dict(ijson.kvitems(f, "", use_float=True))
+
+def _load_snapshot(path: str) -> Dict[str, Any]:
+    """读取记忆快照，.zst结尾的为zstd压缩文件"""
+    if not path.endswith(".zst"):
+        return _load_json_dict(path)
+    if zstandard is None:
+        raise ImportError("读取压缩快照需要安装 zstandard")
+    with open(path, 'rb') as f:
+        return parse_json(zstandard.ZstdDecompressor().decompress(f.read()))
+
+def _call_if_alive(method_ref: weakref.WeakMethod):
+    """实例仍存活时才调用其方法，已被回收则跳过"""
+    method = method_ref()
+    if method is not None:
+        method()
+
+def _intern_fields(memory: Dict[str, Any]):
+    """驻留类型和标签字符串，大量记忆共用同一个字符串对象，类型比较也只需比较指针"""
+    memory_type = memory.get("type")
+    if isinstance(memory_type, str):
+        memory["type"] = sys.intern(memory_type)
+    tags = memory.get("tags")
+    if isinstance(tags, list):
+        memory["tags"] = [sys.intern(tag) if isinstance(tag, str) else tag for tag in tags]
+
 class EnhancedMemoryManager:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.storage_path = config.get("storage_path", "data/plugin_data/enhanced_memory")
         self.max_memories = config.get("max_memories", 5000)
+        # 写前日志累计多少条操作后压缩进快照
+        self.wal_compact_ops = config.get("wal_compact_ops", 1000)
+        # 写前日志最多每隔多少秒fsync一次；0表示每次追加都fsync
+        self.wal_fsync_interval = config.get("wal_fsync_interval", 1.0)
+        # 快照是否用zstd压缩保存
+        self.compress_snapshot = config.get("compress_snapshot", False)
+        if self.compress_snapshot and zstandard is None:
+            logger.warning("未安装 zstandard，快照将以未压缩的JSON保存")
+            self.compress_snapshot = False
         
         # 首先确保存储路径存在
         self._ensure_storage_path()
+        self._json_path = os.path.join(self.storage_path, "memories.json")
+        self._zst_path = self._json_path + ".zst"
+        self._wal_path = os.path.join(self.storage_path, "memories.wal")
+        self._wal_fh = None
+        self._wal_ops = 0
+        self._wal_synced_at = time.monotonic()
+        # 间隔内未fsync的日志由定时器补做，保证断电时最多丢失wal_fsync_interval秒的变更
+        self._wal_unsynced = False
+        self._wal_timer = None
+        self._wal_lock = threading.Lock()
         
         # 初始化组件和内存
         self.memories = {}
+        # 关键词回退搜索用的倒排索引
+        self._search_index = KeywordIndex()
+        # 内容 -> 记忆ID，用于跳过完全重复的内容
+        self._content_ids = {}
+        # 修剪用的得分 importance * (1 - decay)，写入时预先算好
+        self._scores = {}
+        # 增量维护的统计数据，get_stats无需遍历全部记忆
+        self._stats = MemoryStats("其他")
+        # 类型 -> 记忆ID集合，与统计数据一起维护，按类型过滤搜索时直接取用
+        self._type_ids = {}
+        # 等待批量写入FAISS的 (记忆ID, 内容)
+        self._pending_vectors = []
+        # 写入辅助存储失败的记忆ID和自上次同步以来删除的记忆ID，同步辅助存储时只处理这些；
+        # 写入成功的新记忆不必记录，否则在下次同步前会一直累积
+        self._pending_add = set()
+        self._pending_remove = set()
+        self._sync_count = 0
+        # 搜索结果缓存，键中带上数据版本号，记忆变动后旧结果自然失效
+        self._version = 0
+        self._search_cached = lru_cache(maxsize=512)(self._search_uncached)
         self._initialize_components()
         self.load_memories()
+        # 退出时把写前日志压缩进快照，下次启动无需回放；通过弱引用注册，不会让实例常驻到进程退出
+        self._exit_hook = partial(_call_if_alive, weakref.WeakMethod(self.flush))
+        atexit.register(self._exit_hook)
     
     def _ensure_storage_path(self):
         """确保存储路径存在"""
@@ -50,15 +165,23 @@ class EnhancedMemoryManager:
             from memory_extractor import MemoryExtractor
             
             # 初始化FAISS管理器
+            faiss_config = self.config.get("faiss", {})
             self.faiss_manager = FAISSManager(
                 os.path.join(self.storage_path, "faiss_index"),
-                self.config.get("faiss", {}).get("dimension", 384)
+                faiss_config.get("dimension", 384),
+                faiss_config.get("quantization", "none"),
+                faiss_config.get("mmap", False),
+                index_factory=faiss_config.get("index_factory", ""),
+                train_threshold=faiss_config.get("train_threshold", 50000),
+                nprobe=faiss_config.get("nprobe", 10),
+                merge_threshold=faiss_config.get("mmap_merge_threshold", 10000)
             )
             
             # 初始化分类器
             self.classifier = MemoryClassifier(
                 os.path.join(self.storage_path, "classification_model"),
-                self.config.get("classification", {}).get("categories", ["事实", "观点", "用户偏好", "事件", "其他"])
+                self.config.get("classification", {}).get("categories", ["事实", "观点", "用户偏好", "事件", "其他"]),
+                self.config.get("classification", {}).get("quantize", False)
             )
             
             # 初始化记忆图
@@ -84,36 +207,179 @@ class EnhancedMemoryManager:
     
     def load_memories(self):
         """从文件加载记忆"""
+        memories_path = self._latest_snapshot()
+        if memories_path == self._zst_path and zstandard is None:
+            # 若以空记忆继续运行，下次保存会写出更新的memories.json，压缩快照将被永久遮蔽
+            raise ImportError(f"最新的记忆快照 {memories_path} 为zstd压缩格式，需要安装 zstandard 才能读取")
+        
         try:
-            memories_path = os.path.join(self.storage_path, "memories.json")
-            logger.info(f"尝试从路径加载记忆: {memories_path}")
+            logger.info("尝试从路径加载记忆: %s", memories_path or self._json_path)
             
-            if os.path.exists(memories_path):
-                with open(memories_path, 'r', encoding='utf-8') as f:
-                    self.memories = json.load(f)
-                logger.info(f"已加载 {len(self.memories)} 条记忆")
+            if memories_path is not None:
+                self.memories = _load_snapshot(memories_path)
+                logger.info("已加载 %d 条记忆", len(self.memories))
             else:
                 self.memories = {}
                 logger.info("未找到记忆文件，将创建新文件")
-                # 立即创建一个空文件
-                self.save_memories()
                 
         except Exception as e:
             logger.error(f"加载记忆失败: {e}")
             self.memories = {}
+        
+        # 回放上次快照之后的操作，并立即压缩成新快照
+        replayed = self._replay_wal()
+        self._search_index.rebuild(self.memories)
+        self._scores = {}
+        self._content_ids = {}
+        for memory_id, memory in self.memories.items():
+            _intern_fields(memory)
+            self._recompute_score(memory_id)
+            self._content_ids.setdefault(memory.get("content", ""), memory_id)
+        self._stats.rebuild(self.memories)
+        self._type_ids = {}
+        for memory_id, memory in self.memories.items():
+            self._type_ids.setdefault(memory.get("type"), set()).add(memory_id)
+        self._version += 1
+        if replayed:
+            logger.info("已从写前日志回放 %d 条操作", replayed)
+        if replayed or self._latest_snapshot() is None:
+            self.save_memories()
+    
+    def _latest_snapshot(self) -> Optional[str]:
+        """返回最近写入的快照文件；切换压缩配置后两种格式的文件可能同时存在"""
+        existing = [path for path in (self._json_path, self._zst_path) if os.path.exists(path)]
+        return max(existing, key=os.path.getmtime) if existing else None
+    
+    def _replay_wal(self) -> int:
+        """回放写前日志，返回回放的操作数"""
+        if not os.path.exists(self._wal_path):
+            return 0
+        
+        replayed = 0
+        try:
+            with open(self._wal_path, 'rb') as f:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = parse_json(line)
+                    except ValueError:
+                        # 最后一行可能因崩溃只写了一半
+                        logger.warning("写前日志第 %d 行不完整，已忽略其后内容", line_no)
+                        break
+                    
+                    # 格式不对的条目单独跳过，不影响其余操作的回放
+                    try:
+                        op = entry.get("op")
+                        if op == "add":
+                            memory = entry["memory"]
+                            self.memories[memory["id"]] = memory
+                        elif op == "delete":
+                            self.memories.pop(entry["id"], None)
+                        else:
+                            raise ValueError(f"未知操作 {op!r}")
+                    except (KeyError, TypeError, AttributeError, ValueError) as e:
+                        logger.warning("跳过写前日志第 %d 行的无效条目: %r", line_no, e)
+                        continue
+                    replayed += 1
+        except OSError as e:
+            logger.error(f"回放写前日志失败: {e}")
+        return replayed
+    
+    def _recompute_score(self, memory_id: str):
+        """重新计算记忆的修剪得分，importance或decay变化后调用"""
+        memory = self.memories[memory_id]
+        self._scores[memory_id] = memory.get("importance", 0) * (1 - memory.get("decay", 0))
+    
+    def _wal_append(self, op: str, **payload):
+        """追加一条操作到写前日志，必要时压缩"""
+        try:
+            if self._wal_fh is None:
+                self._wal_fh = open(self._wal_path, 'ab', buffering=0)
+            payload["op"] = op
+            self._wal_fh.write(json_line(payload))
+            self._wal_ops += 1
+            
+            # 进程崩溃不会丢失已写入的行，fsync只为防断电，按时间间隔合并
+            with self._wal_lock:
+                now = time.monotonic()
+                elapsed = now - self._wal_synced_at
+                if elapsed >= self.wal_fsync_interval:
+                    os.fsync(self._wal_fh.fileno())
+                    self._wal_synced_at = now
+                    self._wal_unsynced = False
+                else:
+                    self._wal_unsynced = True
+                    if self._wal_timer is None:
+                        self._wal_timer = threading.Timer(self.wal_fsync_interval - elapsed, self._sync_wal)
+                        self._wal_timer.daemon = True
+                        self._wal_timer.start()
+        except Exception as e:
+            logger.error(f"写入写前日志失败，改为保存完整快照: {e}")
+            self.save_memories()
+            return
+        
+        self._maybe_compact()
+    
+    def _sync_wal(self):
+        """定时器回调：把间隔内尚未fsync的日志落盘"""
+        with self._wal_lock:
+            self._wal_timer = None
+            if self._wal_fh is None or not self._wal_unsynced:
+                return
+            try:
+                os.fsync(self._wal_fh.fileno())
+                self._wal_synced_at = time.monotonic()
+                self._wal_unsynced = False
+            except OSError as e:
+                logger.error(f"写前日志fsync失败: {e}")
+    
+    def _maybe_compact(self):
+        """日志过大时写入快照并清空日志"""
+        if self._wal_ops >= self.wal_compact_ops or self._wal_fh.tell() >= WAL_COMPACT_BYTES:
+            self.save_memories()
+    
+    def _truncate_wal(self):
+        """快照落盘后清空写前日志"""
+        with self._wal_lock:
+            if self._wal_timer is not None:
+                self._wal_timer.cancel()
+                self._wal_timer = None
+            self._wal_unsynced = False
+            if self._wal_fh is not None:
+                self._wal_fh.close()
+                self._wal_fh = None
+        if os.path.exists(self._wal_path):
+            open(self._wal_path, 'w').close()
+        self._wal_ops = 0
+    
+    def flush(self):
+        """将写前日志中的操作压缩进快照，并合并FAISS增量索引，关闭前调用"""
+        if self._wal_ops:
+            self.save_memories()
+        if self.faiss_manager is not None:
+            self.faiss_manager.flush()
+    
+    def close(self):
+        """保存尚未压缩的变更并取消退出时的回调，不再使用实例时调用"""
+        self.flush()
+        atexit.unregister(self._exit_hook)
     
     def save_memories(self):
         """保存记忆到文件"""
         try:
-            memories_path = os.path.join(self.storage_path, "memories.json")
+            memories_path = self._zst_path if self.compress_snapshot else self._json_path
             
             # 确保目录存在
             os.makedirs(os.path.dirname(memories_path), exist_ok=True)
             
-            with open(memories_path, 'w', encoding='utf-8') as f:
-                json.dump(self.memories, f, ensure_ascii=False, indent=2)
+            payload = dump_json(self.memories)
+            if self.compress_snapshot:
+                payload = zstandard.ZstdCompressor(level=3).compress(payload)
+            write_file_atomic(memories_path, payload)
+            self._truncate_wal()
             
-            logger.info(f"已保存 {len(self.memories)} 条记忆到 {memories_path}")
+            logger.info("已保存 %d 条记忆到 %s", len(self.memories), memories_path)
             return True
         except Exception as e:
             logger.error(f"保存记忆失败: {e}")
@@ -126,53 +392,119 @@ class EnhancedMemoryManager:
         memory_type: str = None,
         tags: List[str] = None,
         metadata: Dict[str, Any] = None,
-        auto_classify: bool = True
+        auto_classify: bool = True,
+        auto_flush: bool = True,
+        now_iso: str = None
     ) -> str:
-        """添加新记忆"""
-        memory_id = str(uuid.uuid4())
+        """添加新记忆
+        
+        auto_flush为False时向量暂存在队列中，连续添加多条后需调用flush_pending批量写入FAISS；
+        批量添加时可传入同一个now_iso时间戳，省去每条记忆单独取时间。
+        内容与已有记忆完全相同时不重复添加，直接返回已有记忆的ID
+        """
+        existing_id = self._content_ids.get(content)
+        if existing_id is not None:
+            return existing_id
+        
+        memory_id = secrets.token_hex(16)
         
         # 自动分类
         if auto_classify and memory_type is None and self.classifier is not None:
             try:
-                classification = self.classifier.classify(content)
-                memory_type = max(classification.items(), key=lambda x: x[1])[0]
+                memory_type = self._top_category(content)
             except Exception as e:
                 logger.warning(f"自动分类失败: {e}")
                 memory_type = "其他"
         
+        if now_iso is None:
+            now_iso = datetime.now().isoformat()
         memory = {
             "id": memory_id,
             "content": content,
             "importance": max(0.0, min(1.0, importance)),
             "type": memory_type or "其他",
             "tags": tags or [],
-            "created_at": datetime.now().isoformat(),
-            "last_accessed": datetime.now().isoformat(),
+            "created_at": now_iso,
+            "last_accessed": now_iso,
             "access_count": 0,
             "decay": 0.0,
             "metadata": metadata or {}
         }
+        _intern_fields(memory)
         
         # 添加到主存储
         self.memories[memory_id] = memory
+        self._search_index.add(memory_id, content)
+        self._recompute_score(memory_id)
+        self._stats.track(memory)
+        self._type_ids.setdefault(memory["type"], set()).add(memory_id)
+        self._content_ids[content] = memory_id
         
         # 添加到辅助存储（如果可用）
         if self.faiss_manager is not None:
-            try:
-                self.faiss_manager.add_memory(memory_id, content)
-            except Exception as e:
-                logger.error(f"添加到FAISS失败: {e}")
+            if auto_flush:
+                try:
+                    added = self.faiss_manager.add_memory(memory_id, content)
+                except Exception as e:
+                    logger.error(f"添加到FAISS失败: {e}")
+                    added = False
+                if not added:
+                    self._pending_add.add(memory_id)
+            else:
+                self._pending_vectors.append((memory_id, content))
         
         if self.memory_graph is not None:
             try:
                 self.memory_graph.add_memory(memory_id, memory)
             except Exception as e:
                 logger.error(f"添加到记忆图失败: {e}")
+                self._pending_add.add(memory_id)
         
-        self.save_memories()
-        logger.info(f"已添加新记忆: {content[:50]}...")
+        self._wal_append("add", memory=memory)
+        self._version += 1
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("已添加新记忆: %s...", content[:50])
         return memory_id
     
+    def _top_category(self, content: str) -> str:
+        """返回分类器给出的最可能类别"""
+        classification = self.classifier.classify(content)
+        return max(classification, key=classification.get)
+    
+    def _classify_untyped(self, memories: List[Dict[str, Any]]):
+        """为没有类型的记忆批量分类，所有文本一起交给分类器推理"""
+        if not memories:
+            return
+        classifications = None
+        if self.classifier is not None:
+            try:
+                classifications = self.classifier.classify_batch([memory.get("content", "") for memory in memories])
+            except Exception as e:
+                logger.warning(f"批量自动分类失败: {e}")
+        for index, memory in enumerate(memories):
+            if classifications is None:
+                memory["type"] = "其他"
+            else:
+                classification = classifications[index]
+                memory["type"] = max(classification, key=classification.get)
+    
+    def flush_pending(self):
+        """将暂存的向量一次性批量写入FAISS"""
+        if not self._pending_vectors:
+            return
+        pending, self._pending_vectors = self._pending_vectors, []
+        self._version += 1
+        ids = [memory_id for memory_id, _ in pending if memory_id in self.memories]
+        contents = [content for memory_id, content in pending if memory_id in self.memories]
+        try:
+            added = self.faiss_manager.add_batch(ids, contents)
+        except Exception as e:
+            logger.error(f"批量添加到FAISS失败: {e}")
+            added = False
+        if not added:
+            # 留待下次同步辅助存储时补上
+            self._pending_add.update(ids)
+    
     def search_memories(
         self, 
         query: str, 
@@ -181,13 +513,36 @@ class EnhancedMemoryManager:
         memory_type: str = None,
         use_semantic: bool = True
     ) -> List[Dict[str, Any]]:
-        """搜索相关记忆"""
+        """搜索相关记忆，相同参数的重复查询直接返回缓存结果"""
+        return list(self._search_cached(
+            query, limit, min_importance, memory_type, use_semantic, self._version
+        ))
+    
+    def _search_uncached(
+        self,
+        query: str,
+        limit: int,
+        min_importance: float,
+        memory_type: str,
+        use_semantic: bool,
+        version: int
+    ) -> Tuple[Dict[str, Any], ...]:
+        """实际执行搜索，version只作为缓存键的一部分"""
         results = []
         
         # 语义搜索
         if use_semantic and self.faiss_manager is not None:
             try:
-                semantic_results = self.faiss_manager.search_similar(query, limit * 2)
+                # 符合类型的记忆只占少数时只在这些向量中搜索；只按重要性过滤或
+                # 符合类型的占多数时直接搜索，结果再经下方过滤
+                id_filter = None
+                if memory_type:
+                    type_ids = self._type_ids.get(memory_type)
+                    if not type_ids:
+                        return ()
+                    if len(type_ids) <= len(self.memories) * TYPE_PREFILTER_RATIO:
+                        id_filter = type_ids
+                semantic_results = self.faiss_manager.search_similar(query, limit * 2, id_filter)
                 
                 for result in semantic_results:
                     memory_id = result["memory_id"]
@@ -204,15 +559,14 @@ class EnhancedMemoryManager:
         
         # 关键词搜索（回退方案）
         if not use_semantic or not results:
-            for memory_id, memory in self.memories.items():
-                if query.lower() in memory["content"].lower():
-                    # 应用过滤器
-                    if self._passes_filters(memory, min_importance, memory_type):
-                        results.append(memory)
-        
-        # 按重要性排序并返回前N个结果
-        results.sort(key=lambda x: x.get("importance", 0), reverse=True)
-        return results[:limit]
+            for memory_id in self._search_index.match(query):
+                memory = self.memories[memory_id]
+                # 应用过滤器
+                if self._passes_filters(memory, min_importance, memory_type):
+                    results.append(memory)
+        
+        # 按重要性返回前N个结果
+        return tuple(heapq.nlargest(limit, results, key=lambda x: x.get("importance", 0)))
     
     def _passes_filters(self, memory: Dict[str, Any], min_importance: float, memory_type: str) -> bool:
         """检查记忆是否通过过滤器"""
@@ -231,13 +585,10 @@ class EnhancedMemoryManager:
         total_memories = len(self.memories)
         
         # 按类型统计
-        type_counts = {}
-        for memory in self.memories.values():
-            mem_type = memory.get("type", "其他")
-            type_counts[mem_type] = type_counts.get(mem_type, 0) + 1
+        type_counts = dict(self._stats.type_counts)
         
         # 计算平均重要性
-        avg_importance = sum(m.get("importance", 0) for m in self.memories.values()) / total_memories if total_memories > 0 else 0
+        avg_importance = self._stats.importance_sum / total_memories if total_memories > 0 else 0
         
         # 组件状态
         component_status = {
@@ -258,33 +609,66 @@ class EnhancedMemoryManager:
     
     def _prune_memories(self):
         """修剪记忆，移除不重要的"""
-        # 按重要性排序，保留最重要的
-        sorted_memories = sorted(
-            self.memories.items(), 
-            key=lambda x: x[1].get("importance", 0) * (1 - x[1].get("decay", 0)), 
-            reverse=True
-        )
+        # 用有界堆按预先算好的得分选出最重要的前N个记忆，无需整体排序
+        top = heapq.nlargest(self.max_memories, self._scores.items(), key=itemgetter(1))
         
         # 保留前N个记忆
-        self.memories = dict(sorted_memories[:self.max_memories])
+        memories = self.memories
+        self.memories = {memory_id: memories[memory_id] for memory_id, _ in top}
+        removed = memories.keys() - self.memories.keys()
+        for memory_id in removed:
+            self._search_index.remove(memory_id)
+            self._scores.pop(memory_id, None)
+            self._stats.track(memories[memory_id], -1)
+            self._type_ids.get(memories[memory_id].get("type"), set()).discard(memory_id)
+            content = memories[memory_id].get("content", "")
+            if self._content_ids.get(content) == memory_id:
+                del self._content_ids[content]
+            self._pending_remove.add(memory_id)
+            self._wal_append("delete", id=memory_id)
         
         # 更新FAISS索引和记忆图
         self._sync_auxiliary_storage()
+        self._version += 1
     
     def _sync_auxiliary_storage(self):
         """同步辅助存储（FAISS和记忆图）"""
+        self.flush_pending()
+        
+        # 启动后首次及每隔一段时间做全量核对，其余只处理变动的记忆
+        full_sync = self._sync_count % FULL_SYNC_INTERVAL == 0
+        self._sync_count += 1
+        pending_add, self._pending_add = self._pending_add, set()
+        pending_remove, self._pending_remove = self._pending_remove, set()
+        if full_sync:
+            self._full_sync_auxiliary_storage()
+            return
+        
+        if self.faiss_manager is not None:
+            faiss_ids = self.faiss_manager.id_to_index
+            self._sync_faiss(
+                [memory_id for memory_id in pending_add if memory_id in self.memories and memory_id not in faiss_ids],
+                [memory_id for memory_id in pending_remove if memory_id not in self.memories and memory_id in faiss_ids]
+            )
+        
+        if self.memory_graph is not None:
+            graph = self.memory_graph.graph
+            for memory_id in pending_add:
+                if memory_id in self.memories and memory_id not in graph:
+                    self.memory_graph.add_memory(memory_id, self.memories[memory_id])
+            for memory_id in pending_remove:
+                if memory_id not in self.memories and memory_id in graph:
+                    self.memory_graph.remove_memory(memory_id)
+    
+    def _full_sync_auxiliary_storage(self):
+        """全量核对辅助存储与主记忆存储"""
         # 确保FAISS索引和记忆图与主记忆存储同步
         memory_ids = set(self.memories.keys())
         
         # 同步FAISS
         if self.faiss_manager is not None:
-            faiss_ids = set(self.faiss_manager.id_to_index.keys())
-            for memory_id in memory_ids - faiss_ids:
-                if memory_id in self.memories:
-                    self.faiss_manager.add_memory(memory_id, self.memories[memory_id]["content"])
-            
-            for memory_id in faiss_ids - memory_ids:
-                self.faiss_manager.remove_memory(memory_id)
+            faiss_ids = self.faiss_manager.id_to_index.keys()
+            self._sync_faiss(list(memory_ids - faiss_ids), list(faiss_ids - memory_ids))
         
         # 同步记忆图
         if self.memory_graph is not None:
@@ -296,13 +680,22 @@ class EnhancedMemoryManager:
             for memory_id in graph_ids - memory_ids:
                 self.memory_graph.remove_memory(memory_id)
     
+    def _sync_faiss(self, missing: List[str], stale: List[str]):
+        """批量补齐缺失的向量并移除多余的向量，各只编码、保存一次"""
+        for memory_id in missing:
+            self._pending_vectors.append((memory_id, self.memories[memory_id]["content"]))
+        self.flush_pending()
+        if stale:
+            self.faiss_manager.remove_batch(stale)
+    
     def extract_and_add_memories(self, text: str, conversation_context: List[Dict[str, Any]] = None) -> List[str]:
-        """从文本中提取并添加记忆"""
+        """从文本中提取并添加记忆，返回的ID不重复，多次提取到相同内容时只出现一次"""
         if self.extractor is None:
             return []
             
         extracted = self.extractor.extract_from_text(text, conversation_context)
         memory_ids = []
+        now_iso = datetime.now().isoformat()
         
         for memory_data in extracted:
             memory_id = self.add_memory(
@@ -310,10 +703,14 @@ class EnhancedMemoryManager:
                 importance=memory_data["importance"],
                 memory_type=memory_data["type"],
                 tags=memory_data.get("keywords", []),
-                auto_classify=False
+                auto_classify=False,
+                auto_flush=False,
+                now_iso=now_iso
             )
-            memory_ids.append(memory_id)
+            if memory_id not in memory_ids:
+                memory_ids.append(memory_id)
         
+        self.flush_pending()
         return memory_ids
     
     def get_associated_memories(self, memory_id: str, max_results: int = 5) -> List[Dict[str, Any]]:
@@ -346,22 +743,25 @@ class EnhancedMemoryManager:
         """导出记忆到文件"""
         try:
             if format == "json":
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.memories, f, ensure_ascii=False, indent=2)
+                with open(file_path, 'wb') as f:
+                    f.write(dump_json(self.memories))
             elif format == "csv":
                 import csv
-                with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                with open(file_path, 'w', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as f:
                     writer = csv.writer(f)
                     writer.writerow(["ID", "Content", "Type", "Importance", "Tags", "Created At"])
-                    for memory_id, memory in self.memories.items():
-                        writer.writerow([
+                    # 逐行生成的元组交给一次writerows调用，写入先进大缓冲区再批量落到文件
+                    writer.writerows(
+                        (
                             memory_id,
                             memory.get("content", ""),
                             memory.get("type", ""),
                             memory.get("importance", 0),
                             ",".join(memory.get("tags", [])),
                             memory.get("created_at", "")
-                        ])
+                        )
+                        for memory_id, memory in self.memories.items()
+                    )
             else:
                 logger.error(f"不支持的导出格式: {format}")
                 return False
@@ -378,23 +778,23 @@ class EnhancedMemoryManager:
             imported_memories = {}
             
             if format == "json":
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    imported_memories = json.load(f)
+                imported_memories = _load_json_dict(file_path)
                 
             elif format == "csv":
                 import csv
-                with open(file_path, 'r', encoding='utf-8') as f:
+                now_iso = datetime.now().isoformat()
+                with open(file_path, 'r', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as f:
                     reader = csv.DictReader(f)
                     for row in reader:
-                        memory_id = row.get("ID", str(uuid.uuid4()))
+                        memory_id = row.get("ID") or secrets.token_hex(16)
                         memory = {
                             "id": memory_id,
                             "content": row.get("Content", ""),
-                            "type": row.get("Type", "其他"),
+                            "type": row.get("Type") or None,
                             "importance": float(row.get("Importance", 0.5)),
                             "tags": row.get("Tags", "").split(",") if row.get("Tags") else [],
-                            "created_at": row.get("Created At", datetime.now().isoformat()),
-                            "last_accessed": datetime.now().isoformat(),
+                            "created_at": row.get("Created At", now_iso),
+                            "last_accessed": now_iso,
                             "access_count": 0,
                             "decay": 0.0,
                             "metadata": {}
@@ -404,17 +804,30 @@ class EnhancedMemoryManager:
                 logger.error(f"不支持的导入格式: {format}")
                 return False
             
+            new_memories = [
+                (memory_id, memory) for memory_id, memory in imported_memories.items()
+                if memory_id not in self.memories
+            ]
+            self._classify_untyped([memory for _, memory in new_memories if not memory.get("type")])
+            
             # 合并记忆
-            for memory_id, memory in imported_memories.items():
-                if memory_id not in self.memories:
-                    self.memories[memory_id] = memory
-                    
-                    # 添加到辅助存储
-                    if self.faiss_manager is not None:
-                        self.faiss_manager.add_memory(memory_id, memory["content"])
-                    if self.memory_graph is not None:
-                        self.memory_graph.add_memory(memory_id, memory)
+            for memory_id, memory in new_memories:
+                _intern_fields(memory)
+                self.memories[memory_id] = memory
+                self._search_index.add(memory_id, memory.get("content", ""))
+                self._recompute_score(memory_id)
+                self._stats.track(memory)
+                self._type_ids.setdefault(memory.get("type"), set()).add(memory_id)
+                self._content_ids.setdefault(memory.get("content", ""), memory_id)
+                
+                # 添加到辅助存储，向量在合并结束后批量写入
+                if self.faiss_manager is not None:
+                    self._pending_vectors.append((memory_id, memory["content"]))
+                if self.memory_graph is not None:
+                    self.memory_graph.add_memory(memory_id, memory)
             
+            self._version += 1
+            self.flush_pending()
             self.save_memories()
             logger.info(f"已从 {file_path} 导入 {len(imported_memories)} 条记忆")
             return True
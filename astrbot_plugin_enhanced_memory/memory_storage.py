@@ -0,0 +1,165 @@
+import json
+import mmap
+import os
+from array import array
+from collections import Counter
+from typing import List, Dict, Any, Set
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 超过此大小的JSON文件通过mmap直接交给orjson解析，小文件mmap的开销反而更大
+MMAP_MIN_SIZE = 64 * 1024
+
+# CSV导入导出的文件缓冲区大小，大批量记录时减少系统调用次数
+CSV_BUFFER_SIZE = 1 << 20
+
+# 关键词倒排索引的桶数，相邻双字片段按哈希分到这些桶中
+_GRAM_BUCKETS = 1 << 14
+
+def parse_json(raw: bytes) -> Any:
+    """解析UTF-8编码的JSON，优先使用orjson"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+def dump_json(data: Any) -> bytes:
+    """序列化为带缩进的UTF-8 JSON，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+def json_line(data: Any) -> bytes:
+    """序列化为单行JSON（不含缩进），用于追加日志"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8') + b"\n"
+
+def read_json_file(path: str) -> Any:
+    """读取JSON文件，优先使用orjson；大文件用mmap避免额外复制一份文件内容"""
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+        return parse_json(f.read())
+
+def write_file_atomic(path: str, payload: bytes):
+    """先写临时文件并落盘，再原子替换，避免写到一半损坏原文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _gram_buckets(text_lower: str) -> Set[int]:
+    """返回文本中相邻双字片段所在的桶号"""
+    mask = _GRAM_BUCKETS - 1
+    return {hash(text_lower[i:i + 2]) & mask for i in range(len(text_lower) - 1)}
+
+class KeywordIndex:
+    """关键词搜索用的倒排索引
+    
+    只索引相邻双字片段，并按哈希分到固定数量的桶中；每个桶的倒排表是记忆序号组成的
+    紧凑数组，而不是记忆ID字符串的集合。哈希冲突造成的误命中最后用子串匹配排除，
+    单字查询直接扫描小写内容
+    """
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        """清空索引"""
+        self._buckets = {}
+        # 记忆ID -> 小写内容，写入时计算一次，不参与序列化
+        self._content_lower = {}
+        # 记忆ID <-> 序号，删除后空出的序号会被复用
+        self._numbers = {}
+        self._ids = []
+        self._free_numbers = []
+    
+    def add(self, memory_id: str, content: str):
+        """将记忆内容加入索引"""
+        if memory_id in self._numbers:
+            self.remove(memory_id)
+        content_lower = content.lower()
+        if self._free_numbers:
+            number = self._free_numbers.pop()
+            self._ids[number] = memory_id
+        else:
+            number = len(self._ids)
+            self._ids.append(memory_id)
+        self._numbers[memory_id] = number
+        self._content_lower[memory_id] = content_lower
+        
+        buckets = self._buckets
+        for bucket in _gram_buckets(content_lower):
+            posting = buckets.get(bucket)
+            if posting is None:
+                buckets[bucket] = posting = array('I')
+            posting.append(number)
+    
+    def remove(self, memory_id: str):
+        """从索引中移除记忆内容"""
+        number = self._numbers.pop(memory_id, None)
+        if number is None:
+            return
+        content_lower = self._content_lower.pop(memory_id)
+        buckets = self._buckets
+        for bucket in _gram_buckets(content_lower):
+            posting = buckets[bucket]
+            posting.remove(number)
+            if not posting:
+                del buckets[bucket]
+        self._ids[number] = None
+        self._free_numbers.append(number)
+    
+    def rebuild(self, memories: Dict[str, Dict[str, Any]]):
+        """根据给定记忆重建索引"""
+        self.clear()
+        for memory_id, memory in memories.items():
+            self.add(memory_id, memory.get("content", ""))
+    
+    def match(self, query: str) -> List[str]:
+        """返回内容包含查询词的记忆ID"""
+        query_lower = query.lower()
+        content_lower = self._content_lower
+        if not query_lower:
+            return list(content_lower)
+        
+        if len(query_lower) == 1:
+            return [memory_id for memory_id, text in content_lower.items() if query_lower in text]
+        
+        postings = [self._buckets.get(bucket) for bucket in _gram_buckets(query_lower)]
+        if not all(postings):
+            return []
+        
+        # 从最短的倒排表开始求交集，再排除哈希冲突带来的误命中
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        ids = self._ids
+        return [ids[number] for number in candidates if query_lower in content_lower[ids[number]]]
+
+class MemoryStats:
+    """按类型计数和重要性总和，随增删改增量维护，统计时无需遍历全部记忆"""
+    def __init__(self, default_type: str):
+        self.default_type = default_type
+        self.type_counts = Counter()
+        self.importance_sum = 0.0
+    
+    def track(self, memory: Dict[str, Any], sign: int = 1):
+        """将一条记忆计入（sign=1）或移出（sign=-1）统计"""
+        mem_type = memory.get("type", self.default_type)
+        self.type_counts[mem_type] += sign
+        if self.type_counts[mem_type] <= 0:
+            del self.type_counts[mem_type]
+        self.importance_sum += sign * memory.get("importance", 0)
+    
+    def rebuild(self, memories: Dict[str, Dict[str, Any]]):
+        """根据给定记忆重建统计"""
+        self.type_counts = Counter()
+        self.importance_sum = 0.0
+        for memory in memories.values():
+            self.track(memory)